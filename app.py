@@ -3,35 +3,96 @@
 """
 Servidor simple de subastas (prototipo)
 - Flask para endpoints
-- sqlite3 para persistencia ligera
-- Lock por auction_id para manejar exclusión mutua en la actualización de pujas
+- orjson para (de)serializar JSON
+- sqlite3 para persistencia ligera (WAL: una conexión de escritura + pool de lectores)
+- Transacciones BEGIN IMMEDIATE para la exclusión mutua en la actualización de pujas
 """
 
 from flask import Flask, request, jsonify
+from flask.json.provider import JSONProvider
+import orjson
 import sqlite3
 import threading
+import queue
 import time
+from contextlib import contextmanager
 from datetime import datetime, timedelta
 from flask_cors import CORS
+try:
+    import fcntl
+except ImportError:  # Windows: sin flock; allí solo se usa el servidor de desarrollo (un proceso)
+    fcntl = None
 
 DB = "auctions.db"
+READ_POOL_SIZE = 8
+BID_BATCH_MAX = 64       # pujas máximas por transacción
+BID_BATCH_WAIT = 0.005   # segundos que se espera a que lleguen más pujas
+AUCTIONS_CACHE_TTL = 0.25  # segundos que se sirve /auctions desde memoria
+EXPIRY_SWEEP_INTERVAL = 1.0  # segundos entre barridos de subastas vencidas
+WAL_CHECKPOINT_INTERVAL = 30.0  # segundos entre checkpoints PASSIVE del WAL
+WAL_TRUNCATE_EVERY = 10  # cada cuántos checkpoints se usa TRUNCATE (recupera disco)
+BIDS_STREAM_CHUNK = 500  # filas por trozo al emitir /bids/<id>
+
+# SQL reutilizado: el mismo texto permite reaprovechar la caché de sentencias
+# preparadas de cada conexión (cached_statements)
+SQL_INSERT_USER = "INSERT INTO users (name, active) VALUES (?,1) RETURNING id"
+SQL_GET_USER_ACTIVE = "SELECT active FROM users WHERE id = ?"
+SQL_LIST_USERS = "SELECT id, name, active FROM users"
+SQL_INSERT_AUCTION = "INSERT INTO auctions (item_name, current_price, min_increment, end_time, active) VALUES (?,?,?,?,1) RETURNING id"
+SQL_GET_AUCTION = "SELECT id,item_name,current_price,current_winner,min_increment,end_time,active FROM auctions WHERE id=?"
+SQL_GET_AUCTION_BID_STATE = "SELECT current_price, current_winner, min_increment, end_time, active FROM auctions WHERE id = ?"
+SQL_APPLY_BID = (
+    "UPDATE auctions SET current_price=?, current_winner=? "
+    "WHERE id=? AND active=1 AND end_time>=? AND ?>=current_price+min_increment "
+    "AND EXISTS(SELECT 1 FROM users WHERE id=? AND active=1)"
+)
+SQL_CLOSE_AUCTION = "UPDATE auctions SET active=0 WHERE id=?"
+SQL_EXPIRE_AUCTIONS = "UPDATE auctions SET active=0 WHERE active=1 AND end_time < ?"
+SQL_LIST_AUCTIONS_ALL = "SELECT id, item_name, current_price, current_winner, active, end_time FROM auctions ORDER BY id DESC"
+SQL_LIST_AUCTIONS_ACTIVE = "SELECT id, item_name, current_price, current_winner, active, end_time FROM auctions WHERE active=1 ORDER BY id DESC"
+SQL_INSERT_BID = "INSERT INTO bids (auction_id, user_id, amount, ts) VALUES (?,?,?,?)"
+# Paginación por clave (ts, id): cada trozo continúa tras la última fila emitida
+SQL_LIST_BIDS_PAGE = (
+    "SELECT id, user_id, amount, ts FROM bids "
+    "WHERE auction_id=? AND (ts, id) > (?, ?) ORDER BY ts ASC, id ASC LIMIT ?"
+)
+
+class OrjsonProvider(JSONProvider):
+    """Proveedor JSON de Flask respaldado por orjson (mucho más rápido que json)."""
+
+    def dumps(self, obj, **kwargs):
+        return orjson.dumps(obj).decode()
+
+    def loads(self, s, **kwargs):
+        return orjson.loads(s)
+
 app = Flask(__name__)
+app.json = OrjsonProvider(app)
 CORS(app)
 
-# Locks por subasta (auction_id -> threading.Lock)
-auction_locks = {}
-auction_locks_lock = threading.Lock()  # protege el diccionario auction_locks
+def json_body() -> dict:
+    """Parsea el cuerpo de la petición con orjson; {} si falta o no es un objeto."""
+    raw = request.get_data(cache=False)
+    if not raw:
+        return {}
+    try:
+        data = orjson.loads(raw)
+    except orjson.JSONDecodeError:
+        return {}
+    return data if isinstance(data, dict) else {}
 
-def get_auction_lock(auction_id: int) -> threading.Lock:
-    """Obtiene o crea de forma segura el lock para una subasta."""
-    with auction_locks_lock:
-        if auction_id not in auction_locks:
-            auction_locks[auction_id] = threading.Lock()
-        return auction_locks[auction_id]
+def json_bytes(payload: bytes):
+    """Respuesta con JSON ya serializado (evita el paso por jsonify)."""
+    return app.response_class(payload, mimetype="application/json")
 
 def init_db():
     con = sqlite3.connect(DB, check_same_thread=False)
     cur = con.cursor()
+    # WAL es persistente en el fichero: basta con fijarlo una vez al arrancar.
+    # Permite lecturas concurrentes mientras se escribe una puja. El resto de
+    # PRAGMAs son por conexión y se aplican en db_connect().
+    cur.execute("PRAGMA journal_mode=WAL;")
+    cur.execute("PRAGMA foreign_keys=ON;")
     cur.execute("""
     CREATE TABLE IF NOT EXISTS users (
         id INTEGER PRIMARY KEY AUTOINCREMENT,
@@ -61,29 +122,318 @@ def init_db():
         FOREIGN KEY(user_id) REFERENCES users(id)
     );
     """)
+    # /bids/<id> filtra por auction_id y ordena por ts
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_bids_auction_ts ON bids(auction_id, ts);")
+    # Barrido de subastas vencidas (active=1 AND end_time < ?)
+    cur.execute("CREATE INDEX IF NOT EXISTS idx_auctions_active_end ON auctions(end_time) WHERE active=1;")
+    cur.execute("ANALYZE;")
     con.commit()
     con.close()
 
-def db_connect():
-    return sqlite3.connect(DB, check_same_thread=False)
+def db_connect(query_only: bool = False):
+    # isolation_level=None: autocommit; las transacciones se abren con BEGIN explícito
+    con = sqlite3.connect(DB, check_same_thread=False, isolation_level=None, timeout=5.0,
+                          cached_statements=256)
+    # Espera al lock de escritura de SQLite en lugar de fallar con "database is locked"
+    con.execute("PRAGMA busy_timeout=5000")
+    con.execute("PRAGMA foreign_keys=ON")
+    # Estos PRAGMAs solo afectan a la conexión que los fija
+    con.execute("PRAGMA synchronous=NORMAL")  # en WAL: sin fsync por COMMIT
+    con.execute("PRAGMA cache_size=-65536")  # ~64 MiB
+    con.execute("PRAGMA temp_store=MEMORY")
+    con.execute("PRAGMA mmap_size=268435456")  # 256 MiB
+    if query_only:
+        con.execute("PRAGMA query_only=1")
+        # Las columnas de las SELECT se llaman como las claves de la respuesta
+        con.row_factory = sqlite3.Row
+    else:
+        # Los checkpoints normales los hace expiry-sweeper en segundo plano; el
+        # automático (por defecto a 1000 páginas) se sube a ~16 MB de WAL para
+        # que el escritor solo lo pague si el barrido se queda atrás
+        con.execute("PRAGMA wal_autocheckpoint=4000")
+    return con
+
+class ReadPool:
+    """Pool de conexiones de solo lectura; en WAL los lectores no bloquean al escritor."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._idle = queue.Queue()
+        self._created = 0
+        self._created_lock = threading.Lock()
+
+    def _acquire(self):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        # Las conexiones se abren bajo demanda hasta llegar a `size`
+        with self._created_lock:
+            if self._created < self.size:
+                self._created += 1
+                return db_connect(query_only=True)
+        return self._idle.get()
+
+    @contextmanager
+    def get(self):
+        con = self._acquire()
+        try:
+            yield con
+        finally:
+            self._idle.put(con)
+
+pool = ReadPool(READ_POOL_SIZE)
+
+# Única conexión de escritura: SQLite serializa a los escritores de todos modos
+write_conn = None
+write_lock = threading.Lock()
+
+@contextmanager
+def writer():
+    """Entrega la conexión de escritura compartida con write_lock adquirido."""
+    global write_conn
+    with write_lock:
+        if write_conn is None:
+            write_conn = db_connect()
+        try:
+            yield write_conn
+        except Exception:
+            # No dejar la conexión compartida con una transacción a medias
+            if write_conn.in_transaction:
+                write_conn.rollback()
+            raise
+
+# --- Caché de /auctions ---
+# Guarda la respuesta ya serializada de cada variante ("all" / "active") como
+# (instante monotonic, bytes). "gen" se incrementa al invalidar para no guardar
+# un resultado calculado antes de una invalidación concurrente.
+_auctions_cache = {"gen": 0, "all": None, "active": None}
+_auctions_cache_lock = threading.Lock()
+
+def invalidate_auctions_cache():
+    with _auctions_cache_lock:
+        _auctions_cache["gen"] += 1
+        _auctions_cache["all"] = None
+        _auctions_cache["active"] = None
+
+# --- Barrido de subastas vencidas y checkpoints del WAL ---
+# Se hace en segundo plano para que /auctions sea de solo lectura y para que los
+# checkpoints no caigan a mitad de una petición.
+
+def sweep_expired_auctions() -> int:
+    """Marca como inactivas las subastas vencidas; devuelve cuántas cambió."""
+    with writer() as con:
+        cur = con.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        cur.execute(SQL_EXPIRE_AUCTIONS, (int(time.time()),))
+        changed = cur.rowcount
+        cur.execute("COMMIT")
+    if changed:
+        invalidate_auctions_cache()
+    return changed
+
+def checkpoint_wal(con, mode: str = "PASSIVE"):
+    """PASSIVE copia lo que puede sin bloquear; TRUNCATE además vacía el fichero WAL.
+
+    Devuelve la fila (busy, log, checkpointed) de SQLite.
+    """
+    return con.execute(f"PRAGMA wal_checkpoint({mode})").fetchone()
+
+# Con varios workers de gunicorn todos arrancan el hilo, pero solo barre y hace
+# checkpoints el proceso que tiene el flock; si ese worker muere, el lock se
+# libera y otro lo toma en su siguiente vuelta.
+SWEEPER_LOCK_FILE = DB + ".sweeper.lock"
+_sweeper_lock_file = None
+
+def hold_sweeper_lock() -> bool:
+    """True si este proceso es (o acaba de pasar a ser) el encargado del barrido."""
+    global _sweeper_lock_file
+    if _sweeper_lock_file is not None or fcntl is None:
+        return True
+    f = open(SWEEPER_LOCK_FILE, "a")
+    try:
+        fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        f.close()
+        return False
+    _sweeper_lock_file = f
+    return True
+
+def expiry_sweeper_loop():
+    # Conexión propia para los checkpoints: no retiene write_lock mientras tanto
+    checkpoint_con = None
+    last_checkpoint = time.monotonic()
+    checkpoints = 0
+    while True:
+        time.sleep(EXPIRY_SWEEP_INTERVAL)
+        if not hold_sweeper_lock():
+            continue
+        try:
+            sweep_expired_auctions()
+        except Exception:
+            app.logger.exception("expiry sweep failed")
+        if time.monotonic() - last_checkpoint < WAL_CHECKPOINT_INTERVAL:
+            continue
+        last_checkpoint = time.monotonic()
+        checkpoints += 1
+        try:
+            if checkpoint_con is None:
+                checkpoint_con = db_connect()
+                # Sin espera: un checkpoint nunca debe retener a los escritores
+                # mientras aguarda a lectores lentos (p.ej. /bids en streaming)
+                checkpoint_con.execute("PRAGMA busy_timeout=0")
+            busy, log, checkpointed = checkpoint_wal(checkpoint_con, "PASSIVE")
+            # TRUNCATE solo cuando el WAL ya está copiado entero: así no tiene
+            # que esperar a nadie y solo resetea el fichero
+            if checkpoints % WAL_TRUNCATE_EVERY == 0 and not busy and log > 0 and log == checkpointed:
+                checkpoint_wal(checkpoint_con, "TRUNCATE")
+        except Exception:
+            app.logger.exception("wal checkpoint failed")
+
+def start_expiry_sweeper():
+    # Los hilos no sobreviven a un fork: con gunicorn se arranca en cada worker
+    # (post_fork en gunicorn_conf.py) y hold_sweeper_lock() elige uno
+    threading.Thread(target=expiry_sweeper_loop, name="expiry-sweeper", daemon=True).start()
+
+# --- Escritor de pujas por lotes ---
+# Las pujas se encolan y un único hilo las agrupa en una transacción, de modo que
+# un fsync del WAL cubre muchas pujas. Al ser un solo hilo, las pujas de una misma
+# subasta quedan serializadas sin locks adicionales.
+
+class PendingBid:
+    """Puja encolada; `outcome` ((body, status)) se rellena antes de `done.set()`.
+
+    El timestamp lo pone el hilo escritor, uno por lote.
+    """
+    __slots__ = ("auction_id", "user_id", "amount", "done", "outcome")
+
+    def __init__(self, auction_id: int, user_id: int, amount: float):
+        self.auction_id = auction_id
+        self.user_id = user_id
+        self.amount = amount
+        self.done = threading.Event()
+        self.outcome = None
+
+bid_queue = queue.Queue()
+bid_writer_thread = None
+bid_writer_start_lock = threading.Lock()
+
+def bid_rejection(cur, bid: PendingBid, now_ts: int):
+    """Tras un UPDATE condicional fallido, relee la subasta para dar el motivo exacto."""
+    cur.execute(SQL_GET_AUCTION_BID_STATE, (bid.auction_id,))
+    row = cur.fetchone()
+    if not row:
+        return {"error":"auction not found"}, 404
+    current_price, _, min_increment, end_time, active = row
+    if not active or now_ts > end_time:
+        return {"error":"auction closed"}, 400
+    cur.execute(SQL_GET_USER_ACTIVE, (bid.user_id,))
+    user_row = cur.fetchone()
+    if not user_row:
+        return {"error":"user not found"}, 404
+    if not user_row[0]:
+        return {"error":"user not active"}, 400
+    return {
+        "success": False,
+        "reason": "amount_too_low",
+        "current_price": float(current_price),
+        "required_minimum": float(current_price) + float(min_increment)
+    }, 400
+
+def process_bid_batch(batch):
+    """Valida y aplica un lote de pujas en una sola transacción BEGIN IMMEDIATE."""
+    outcomes = []
+    bid_rows = []
+    with writer() as con:
+        cur = con.cursor()
+        cur.execute("BEGIN IMMEDIATE")
+        # Un solo reloj por lote, leído ya con el lock de escritura: la espera a
+        # write_lock/BEGIN no debe envejecer el ts ni el control de end_time
+        now_ts = time.time_ns() // 10**9
+        for bid in batch:
+            # Validación y actualización en una sola sentencia; solo se relee
+            # la subasta cuando la puja es rechazada
+            try:
+                cur.execute(
+                    SQL_APPLY_BID,
+                    (bid.amount, bid.user_id, bid.auction_id, now_ts, bid.amount, bid.user_id)
+                )
+                rejection = bid_rejection(cur, bid, now_ts) if cur.rowcount == 0 else None
+            except (sqlite3.Error, OverflowError):
+                # Un error de sentencia solo deshace esa sentencia: la puja falla
+                # sola y el resto del lote sigue. Si SQLite abortó la transacción
+                # entera, writer() y bid_writer_loop responden 500 a todo el lote.
+                if not con.in_transaction:
+                    raise
+                app.logger.exception("bid failed")
+                outcomes.append(({"error":"could not store bid, try again"}, 500))
+                continue
+            if rejection is not None:
+                outcomes.append(rejection)
+                continue
+            bid_rows.append((bid.auction_id, bid.user_id, bid.amount, now_ts))
+            outcomes.append(({
+                "success": True,
+                "auction_id": bid.auction_id,
+                "user_id": bid.user_id,
+                "amount": bid.amount,
+                "current_price": bid.amount
+            }, 200))
+        # Todas las pujas aceptadas en un solo executemany
+        cur.executemany(SQL_INSERT_BID, bid_rows)
+        cur.execute("COMMIT")
+    if bid_rows:
+        invalidate_auctions_cache()
+    # Las respuestas se publican solo tras el COMMIT
+    for bid, outcome in zip(batch, outcomes):
+        bid.outcome = outcome
+        bid.done.set()
+
+def bid_writer_loop():
+    while True:
+        batch = [bid_queue.get()]
+        deadline = time.monotonic() + BID_BATCH_WAIT
+        while len(batch) < BID_BATCH_MAX:
+            remaining = deadline - time.monotonic()
+            try:
+                batch.append(bid_queue.get(timeout=remaining) if remaining > 0 else bid_queue.get_nowait())
+            except queue.Empty:
+                break
+        try:
+            process_bid_batch(batch)
+        except Exception:
+            app.logger.exception("bid batch failed")
+            for bid in batch:
+                bid.outcome = ({"error":"could not store bid, try again"}, 500)
+                bid.done.set()
+
+def submit_bid(bid: PendingBid):
+    """Encola la puja (arrancando el hilo escritor si hace falta) y espera su resultado."""
+    global bid_writer_thread
+    if bid_writer_thread is None:
+        with bid_writer_start_lock:
+            if bid_writer_thread is None:
+                bid_writer_thread = threading.Thread(target=bid_writer_loop, name="bid-writer", daemon=True)
+                bid_writer_thread.start()
+    bid_queue.put(bid)
+    bid.done.wait()
+    return bid.outcome
 
 @app.route("/user", methods=["POST"])
 def create_user():
-    data = request.json or {}
+    data = json_body()
     name = data.get("name")
     if not name:
         return jsonify({"error":"name required"}), 400
-    con = db_connect()
-    cur = con.cursor()
-    cur.execute("INSERT INTO users (name, active) VALUES (?,1)", (name,))
-    user_id = cur.lastrowid
-    con.commit()
-    con.close()
+    with writer() as con:
+        cur = con.cursor()
+        cur.execute(SQL_INSERT_USER, (name,))
+        user_id = cur.fetchone()[0]
     return jsonify({"user_id": user_id, "name": name}), 201
 
 @app.route("/auction", methods=["POST"])
 def create_auction():
-    data = request.json or {}
+    data = json_body()
     item_name = data.get("item_name")
     start_price = float(data.get("start_price", 0))
     min_increment = float(data.get("min_increment", 1))
@@ -91,198 +441,123 @@ def create_auction():
     if not item_name:
         return jsonify({"error":"item_name required"}), 400
     end_time = int(time.time()) + duration_seconds
-    con = db_connect()
-    cur = con.cursor()
-    cur.execute(
-        "INSERT INTO auctions (item_name, current_price, min_increment, end_time, active) VALUES (?,?,?,?,1)",
-        (item_name, start_price, min_increment, end_time)
-    )
-    auction_id = cur.lastrowid
-    con.commit()
-    con.close()
+    with writer() as con:
+        cur = con.cursor()
+        cur.execute(SQL_INSERT_AUCTION, (item_name, start_price, min_increment, end_time))
+        auction_id = cur.fetchone()[0]
+    invalidate_auctions_cache()
     return jsonify({"auction_id": auction_id, "item_name": item_name, "end_time": end_time}), 201
 
 @app.route("/auction/<int:auction_id>", methods=["GET"])
 def get_auction(auction_id):
-    con = db_connect()
-    cur = con.cursor()
-    cur.execute("SELECT id,item_name,current_price,current_winner,min_increment,end_time,active FROM auctions WHERE id=?", (auction_id,))
-    row = cur.fetchone()
-    con.close()
+    with pool.get() as con:
+        cur = con.cursor()
+        cur.execute(SQL_GET_AUCTION, (auction_id,))
+        row = cur.fetchone()
     if not row:
         return jsonify({"error":"auction not found"}), 404
-    (aid,item_name,current_price,current_winner,min_increment,end_time,active) = row
-    return jsonify({
-        "id": aid,
-        "item_name": item_name,
-        "current_price": current_price,
-        "current_winner": current_winner,
-        "min_increment": min_increment,
-        "end_time": end_time,
-        "active": bool(active)
-    })
+    return jsonify({**row, "active": bool(row["active"])})
 
 @app.route("/bid", methods=["POST"])
 def place_bid():
     """
     Body JSON: { "auction_id": int, "user_id": int, "amount": float }
     """
-    data = request.json or {}
-    try:
-        auction_id = int(data.get("auction_id"))
-        user_id = int(data.get("user_id"))
-        amount = float(data.get("amount"))
-    except Exception:
+    data = json_body()
+    auction_id = data.get("auction_id")
+    user_id = data.get("user_id")
+    amount = data.get("amount")
+    # orjson ya entrega números: basta con comprobar tipos (bool es subclase de int)
+    if (type(auction_id) is not int or type(user_id) is not int
+            or type(amount) not in (int, float)):
         return jsonify({"error":"auction_id, user_id, amount required and must be numeric"}), 400
-
-    # Basic checks: auction exists, user exists
-    con = db_connect()
-    cur = con.cursor()
-    cur.execute("SELECT id, current_price, min_increment, end_time, active FROM auctions WHERE id = ?", (auction_id,))
-    auction_row = cur.fetchone()
-    if not auction_row:
-        con.close()
+    # Ids fuera del rango de INTEGER de SQLite no existen (y no se pueden enlazar)
+    if not 0 < auction_id < 2**63:
         return jsonify({"error":"auction not found"}), 404
-
-    _, current_price, min_increment, end_time, active = auction_row
-
-    # check auction time and active flag
-    now_ts = int(time.time())
-    if not active or now_ts > end_time:
-        # mark inactive if time passed
-        if now_ts > end_time:
-            cur.execute("UPDATE auctions SET active=0 WHERE id=?", (auction_id,))
-            con.commit()
-        con.close()
-        return jsonify({"error":"auction closed"}), 400
-
-    cur.execute("SELECT id, name, active FROM users WHERE id = ?", (user_id,))
-    user_row = cur.fetchone()
-    if not user_row:
-        con.close()
+    if not 0 < user_id < 2**63:
         return jsonify({"error":"user not found"}), 404
-    if not user_row[2]:
-        con.close()
-        return jsonify({"error":"user not active"}), 400
-
-    # Acquire lock for this auction to protect the critical region:
-    lock = get_auction_lock(auction_id)
-    acquired = lock.acquire(timeout=5)  # espera hasta 5s para evitar deadlocks permanentes
-    if not acquired:
-        con.close()
-        return jsonify({"error":"could not acquire auction lock, try again"}), 500
+    amount = float(amount)
 
-    try:
-        # Re-read the current price inside the lock (double-check)
-        cur.execute("SELECT current_price FROM auctions WHERE id = ?", (auction_id,))
-        row2 = cur.fetchone()
-        if not row2:
-            return jsonify({"error":"auction not found (post-lock)"}), 404
-        current_price = float(row2[0])
-        required_min = current_price + float(min_increment)
-
-        if amount < required_min:
-            return jsonify({
-                "success": False,
-                "reason": "amount_too_low",
-                "current_price": current_price,
-                "required_minimum": required_min
-            }), 400
-
-        # All good: insert bid and update auction
-        ts = now_ts
-        cur.execute(
-            "INSERT INTO bids (auction_id, user_id, amount, ts) VALUES (?,?,?,?)",
-            (auction_id, user_id, amount, ts)
-        )
-        cur.execute(
-            "UPDATE auctions SET current_price=?, current_winner=? WHERE id=?",
-            (amount, user_id, auction_id)
-        )
-        con.commit()
-
-        return jsonify({
-            "success": True,
-            "auction_id": auction_id,
-            "user_id": user_id,
-            "amount": amount,
-            "current_price": amount
-        }), 200
-
-    finally:
-        lock.release()
-        con.close()
+    # Existencia de subasta/usuario, estado y monto se validan en el propio UPDATE
+    # del hilo escritor; solo si falla se consulta el motivo
+    body, status = submit_bid(PendingBid(auction_id, user_id, amount))
+    return jsonify(body), status
 
 @app.route("/bids/<int:auction_id>", methods=["GET"])
 def list_bids(auction_id):
-    con = db_connect()
-    cur = con.cursor()
-    cur.execute("SELECT id, user_id, amount, ts FROM bids WHERE auction_id=? ORDER BY ts ASC", (auction_id,))
-    rows = cur.fetchall()
-    con.close()
-    res = [{"id":r[0],"user_id":r[1],"amount":r[2],"ts":r[3]} for r in rows]
-    return jsonify(res)
+    """Emite las pujas por trozos para no materializar subastas con miles de pujas."""
+    def generate():
+        # Cada trozo toma una conexión del pool y la devuelve antes de emitirse:
+        # un cliente lento no retiene lectores ni un snapshot del WAL
+        yield b"["
+        sep = b""
+        last_ts, last_id = -1, -1
+        while True:
+            with pool.get() as con:
+                rows = con.execute(
+                    SQL_LIST_BIDS_PAGE, (auction_id, last_ts, last_id, BIDS_STREAM_CHUNK)
+                ).fetchall()
+            if not rows:
+                break
+            last_ts, last_id = rows[-1]["ts"], rows[-1]["id"]
+            # Cada trozo se serializa como lista y se le quitan los corchetes
+            yield sep + orjson.dumps([dict(r) for r in rows])[1:-1]
+            sep = b","
+            if len(rows) < BIDS_STREAM_CHUNK:
+                break
+        yield b"]"
+    return json_bytes(generate())
 
 # --- util endpoint to close auction (force) ---
 @app.route("/auction/<int:auction_id>/close", methods=["POST"])
 def close_auction(auction_id):
-    con = db_connect()
-    cur = con.cursor()
-    cur.execute("UPDATE auctions SET active=0 WHERE id=?", (auction_id,))
-    con.commit()
-    con.close()
+    with writer() as con:
+        con.execute(SQL_CLOSE_AUCTION, (auction_id,))
+    invalidate_auctions_cache()
     return jsonify({"closed": auction_id})
 
 @app.route("/users", methods=["GET"])
 def list_users():
-    con = db_connect()
-    cur = con.cursor()
-    cur.execute("SELECT id, name, active FROM users")
-    rows = cur.fetchall()
-    con.close()
-    result = [
-        {"id": r[0], "name": r[1], "active": bool(r[2])}
-        for r in rows
-    ]
-    return jsonify(result)
+    with pool.get() as con:
+        cur = con.cursor()
+        cur.execute(SQL_LIST_USERS)
+        rows = cur.fetchall()
+    return json_bytes(orjson.dumps([{**r, "active": bool(r["active"])} for r in rows]))
 
 @app.route("/auctions", methods=["GET"])
 def list_auctions():
-    """Lista todas las subastas activas (o todas, si se pasa ?all=1) y actualiza estados vencidos."""
-    show_all = request.args.get("all") == "1"
-    now = int(time.time())
+    """Lista todas las subastas activas (o todas, si se pasa ?all=1).
 
-    con = db_connect()
-    cur = con.cursor()
-
-    # 🔄 Actualizar automáticamente subastas vencidas
-    cur.execute("UPDATE auctions SET active=0 WHERE active=1 AND end_time < ?", (now,))
-    con.commit()
+    Los estados vencidos los actualiza el hilo expiry-sweeper, no esta petición.
+    """
+    show_all = request.args.get("all") == "1"
+    key = "all" if show_all else "active"
+    with _auctions_cache_lock:
+        cached = _auctions_cache[key]
+        gen = _auctions_cache["gen"]
+    if cached is not None and time.monotonic() - cached[0] < AUCTIONS_CACHE_TTL:
+        return json_bytes(cached[1])
 
-    # Luego listamos
-    if show_all:
-        cur.execute("SELECT id, item_name, current_price, current_winner, active, end_time FROM auctions ORDER BY id DESC")
-    else:
-        cur.execute("SELECT id, item_name, current_price, current_winner, active, end_time FROM auctions WHERE active=1 ORDER BY id DESC")
-    rows = cur.fetchall()
-    con.close()
+    with pool.get() as con:
+        cur = con.cursor()
+        if show_all:
+            cur.execute(SQL_LIST_AUCTIONS_ALL)
+        else:
+            cur.execute(SQL_LIST_AUCTIONS_ACTIVE)
+        rows = cur.fetchall()
 
-    return jsonify([
-        {
-            "id": r[0],
-            "item_name": r[1],
-            "current_price": r[2],
-            "current_winner": r[3],
-            "active": bool(r[4]),
-            "end_time": r[5]
-        }
-        for r in rows
-    ])
+    payload = orjson.dumps([{**r, "active": bool(r["active"])} for r in rows])
+    with _auctions_cache_lock:
+        if _auctions_cache["gen"] == gen:
+            _auctions_cache[key] = (time.monotonic(), payload)
+    return json_bytes(payload)
 
 
 
 if __name__ == "__main__":
     init_db()
+    start_expiry_sweeper()
     # Opcional: crear datos de ejemplo si se quiere
-    # Levanta servidor en 127.0.0.1:5000
+    # Servidor de desarrollo en 0.0.0.0:5000; para carga usar gunicorn:
+    #   gunicorn -c gunicorn_conf.py app:app
     app.run(host="0.0.0.0", port=5000, threaded=True)
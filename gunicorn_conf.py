@@ -0,0 +1,29 @@
+# gunicorn_conf.py
+"""
+Configuración de gunicorn para el servidor de subastas.
+
+Uso: gunicorn -c gunicorn_conf.py app:app
+
+- Varios procesos con hilos (gthread): las lecturas se reparten entre núcleos;
+  las escrituras siguen serializadas por SQLite (WAL + BEGIN IMMEDIATE).
+- El esquema se crea una sola vez en el proceso maestro; cada worker abre su
+  propio pool de conexiones y arranca sus hilos de fondo tras el fork. El
+  barrido de subastas vencidas y los checkpoints del WAL solo los ejecuta el
+  worker que tiene el flock de app.SWEEPER_LOCK_FILE.
+"""
+
+from app import READ_POOL_SIZE
+
+bind = "0.0.0.0:5000"
+workers = 4
+worker_class = "gthread"
+threads = READ_POOL_SIZE  # ningún hilo espera a un lector del pool
+preload_app = True
+
+def on_starting(server):
+    from app import init_db
+    init_db()
+
+def post_fork(server, worker):
+    from app import start_expiry_sweeper
+    start_expiry_sweeper()